@@ -0,0 +1,26 @@
+"""
+_xor.py — The XOR cipher shared by steg_core and unicode_steg.
+"""
+
+import numpy as np
+
+XOR_NUMPY_MIN = 64   # payload bytes below which xor_cipher stays in pure Python
+
+
+def xor_cipher(data: bytes, key: str) -> bytes:
+    """XOR-encrypt / decrypt bytes with a string key."""
+    if not key:
+        return data
+    kb = key.encode("utf-8")
+    if len(data) < XOR_NUMPY_MIN:   # NumPy setup costs more than it saves here
+        return bytes(b ^ kb[i % len(kb)] for i, b in enumerate(data))
+    # XOR in place, one key-length row at a time via broadcasting, so the
+    # repeated key is never materialised as a second data-sized array
+    out  = bytearray(data)
+    d    = np.frombuffer(out, dtype=np.uint8)
+    k    = np.frombuffer(kb, dtype=np.uint8)
+    full = d.size - d.size % k.size
+    rows = d[:full].reshape(-1, k.size)   # a view: writes land in out
+    rows ^= k
+    d[full:] ^= k[:d.size - full]
+    return bytes(out)
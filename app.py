@@ -7,8 +7,16 @@ import streamlit as st
 from PIL import Image
 import io
 import os
+import glob
 from steg_core import encode, decode, get_max_chars, LOSSY_EXTS, SUPPORTED
 
+PREVIEW_SIZE     = (512, 512)
+CACHE_TTL        = 600   # seconds; caches below hold full-size images server-wide
+DECODE_CACHE_TTL = 60    # seconds; decoded messages are secrets shared across sessions
+BASE_DIR         = os.path.dirname(os.path.abspath(__file__))
+SNIPPETS_DIR     = os.path.join(BASE_DIR, "snippets")
+CSS_PATH         = os.path.join(BASE_DIR, "style.css")
+
 # ── Page config ───────────────────────────────────────────────────────────────
 
 st.set_page_config(
@@ -18,71 +26,74 @@ st.set_page_config(
 )
 
 # ── Custom CSS ────────────────────────────────────────────────────────────────
+# Read from style.css once per server. It must still be emitted on every
+# full-script run (Streamlit drops elements a run doesn't re-emit), but
+# widget interactions inside the tab fragments below skip this entirely.
+
+@st.cache_resource(show_spinner=False)
+def _load_css() -> str:
+    with open(CSS_PATH, encoding="utf-8") as f:
+        return f.read()
+
+
+st.markdown(f"<style>{_load_css()}</style>", unsafe_allow_html=True)
+
+# ── Cached helpers ────────────────────────────────────────────────────────────
+
+# Helpers are keyed on the upload's file_id, so a rerun never hashes the file
+# bytes; the leading underscore keeps `_file_bytes` out of the cache key.
+
+@st.cache_resource(show_spinner=False, max_entries=2, ttl=CACHE_TTL)
+def _open_rgb(file_id: str, _file_bytes: bytes) -> Image.Image:
+    """
+    Decode an uploaded file once; reruns get the same cached RGB image back
+    without unpickling a copy. Shared, so callers must not modify it.
+    """
+    return Image.open(io.BytesIO(_file_bytes)).convert("RGB")
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _thumbnail(file_id: str, _file_bytes: bytes) -> Image.Image:
+    """Small preview copy, so reruns don't ship the full-resolution image."""
+    thumb = _open_rgb(file_id, _file_bytes).copy()
+    thumb.thumbnail(PREVIEW_SIZE, Image.Resampling.BILINEAR)
+    return thumb
+
 
-st.markdown("""
-<style>
-    /* Page background */
-    .stApp { background: #0f0f0f; }
-
-    /* Cards */
-    .card {
-        background: white;
-        border-radius: 12px;
-        padding: 1.5rem 2rem;
-        margin-bottom: 1.2rem;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.08);
-    }
-
-    /* Title */
-    .main-title {
-        text-align: center;
-        font-size: 2.2rem;
-        font-weight: 800;
-        color: #1a202c;
-        margin-bottom: 0;
-    }
-    .main-subtitle {
-        text-align: center;
-        color: #718096;
-        font-size: 0.95rem;
-        margin-bottom: 1.5rem;
-    }
-
-    /* Success / error banners */
-    .success-box {
-        background: #c6f6d5; border-left: 4px solid #38a169;
-        border-radius: 8px; padding: 0.8rem 1rem;
-        color: #22543d; margin-top: 0.8rem;
-    }
-    .error-box {
-        background: #fed7d7; border-left: 4px solid #e53e3e;
-        border-radius: 8px; padding: 0.8rem 1rem;
-        color: #742a2a; margin-top: 0.8rem;
-    }
-    .warn-box {
-        background: #fefcbf; border-left: 4px solid #d69e2e;
-        border-radius: 8px; padding: 0.8rem 1rem;
-        color: #744210; margin-top: 0.4rem; margin-bottom: 0.4rem;
-    }
-    .info-box {
-        background: #bee3f8; border-left: 4px solid #3182ce;
-        border-radius: 8px; padding: 0.8rem 1rem;
-        color: #2a4365; margin-top: 0.4rem;
-    }
-
-    /* Capacity badge */
-    .cap-badge {
-        display: inline-block;
-        background: #ebf8ff; color: #2b6cb0;
-        border-radius: 20px; padding: 3px 12px;
-        font-size: 0.85rem; font-weight: 600;
-        margin-top: 6px;
-    }
-
-    /* Hide Streamlit branding */
-    #MainMenu, footer { visibility: hidden; }
-</style>
-""", unsafe_allow_html=True)
+@st.cache_data(show_spinner=False, max_entries=2, ttl=CACHE_TTL)
+def _encode_cached(file_id: str, _file_bytes: bytes, message: bytes, password: str) -> tuple[bool, str, bytes]:
+    """encode() memoized on (image, message, password) — repeat clicks are free."""
+    return encode(_open_rgb(file_id, _file_bytes), message, password)
+
+
+@st.cache_data(show_spinner=False, max_entries=4, ttl=DECODE_CACHE_TTL)
+def _decode_cached(file_id: str, _file_bytes: bytes, password: str) -> tuple[bool, str]:
+    """decode() memoized on (image, password) — briefly, as results are secrets."""
+    return decode(_open_rgb(file_id, _file_bytes), password)
+
+
+@st.cache_data(show_spinner=False)
+def _capacity_info(w: int, h: int, ext: str) -> tuple[int, bool, str]:
+    """Return (max_chars, is_lossy, size/format/capacity HTML) for an upload."""
+    max_chars = get_max_chars(w * h)
+    is_lossy  = ext in LOSSY_EXTS
+    fmt       = 'JPEG → will save as PNG ⚠' if is_lossy else ext.upper().lstrip('.')
+    html = (
+        f'<b>Size:</b> {w} × {h} px<br>'
+        f'<b>Format:</b> {fmt}<br>'
+        f'<span class="cap-badge">📊 Capacity: up to {max_chars:,} bytes</span>'
+    )
+    return max_chars, is_lossy, html
+
+
+@st.cache_resource(show_spinner=False)
+def _load_snippets() -> dict[str, str]:
+    """Read the Source Code tab's listings from snippets/ once per server."""
+    snippets = {}
+    for path in glob.glob(os.path.join(SNIPPETS_DIR, "*.py.txt")):
+        with open(path, encoding="utf-8") as f:
+            snippets[os.path.basename(path)[:-len(".py.txt")]] = f.read().rstrip("\n")
+    return snippets
 
 # ── Title ─────────────────────────────────────────────────────────────────────
 
@@ -103,7 +114,8 @@ tab_encode, tab_decode, tab_code = st.tabs([
 # ENCODE TAB
 # ═══════════════════════════════════════════════════════════════════════════════
 
-with tab_encode:
+@st.fragment
+def _encode_tab():
 
     st.markdown("### Step 1 — Upload your image")
     uploaded = st.file_uploader(
@@ -115,24 +127,23 @@ with tab_encode:
 
     if uploaded:
         ext = os.path.splitext(uploaded.name)[1].lower()
-        is_lossy = ext in LOSSY_EXTS
 
         # Show preview + capacity
-        img = Image.open(uploaded)
+        data = uploaded.getvalue()
+        img  = _open_rgb(uploaded.file_id, data)
+        w, h = img.size
+        max_chars, is_lossy, cap_html = _capacity_info(w, h, ext)
         col_img, col_info = st.columns([1, 1])
 
         with col_img:
-            st.image(img, caption=uploaded.name, use_container_width=True)
+            st.image(_thumbnail(uploaded.file_id, data),
+                     caption=uploaded.name, use_container_width=True)
 
         with col_info:
-            w, h = img.size
-            max_chars = get_max_chars(w * h)
             st.markdown(f"""
             <div style="padding-top:10px">
                 <b>File:</b> {uploaded.name}<br>
-                <b>Size:</b> {w} × {h} px<br>
-                <b>Format:</b> {'JPEG → will save as PNG ⚠' if is_lossy else ext.upper().lstrip('.')}<br>
-                <span class="cap-badge">📊 Capacity: up to {max_chars:,} characters</span>
+                {cap_html}
             </div>
             """, unsafe_allow_html=True)
 
@@ -145,6 +156,9 @@ with tab_encode:
         st.divider()
         st.markdown("### Step 2 — Type your secret message")
 
+        # No max_chars here: it would silently drop an over-long paste, and
+        # since it is part of the widget's identity, switching to an image of
+        # another size would clear the message. The counter below flags it.
         message = st.text_area(
             "Secret message",
             height=140,
@@ -152,14 +166,15 @@ with tab_encode:
             label_visibility="collapsed",
         )
 
-        # Live character counter
-        char_count = len(message)
-        if char_count > 0:
-            pct   = char_count / max_chars
+        # Capacity counter — only rendered inside this tab's fragment rerun
+        if message:
+            used  = len(message.strip().encode("utf-8"))
+            pct   = used / max_chars if max_chars > 0 else float("inf")
             color = "#e53e3e" if pct > 1 else ("#d69e2e" if pct > 0.85 else "#38a169")
             st.markdown(
                 f'<p style="text-align:right; color:{color}; font-size:0.85rem; margin:0">'
-                f'{char_count:,} / {max_chars:,} characters</p>',
+                f'{used:,} / {max_chars:,} bytes'
+                f'{" — message too long" if pct > 1 else ""}</p>',
                 unsafe_allow_html=True)
 
         st.divider()
@@ -180,27 +195,33 @@ with tab_encode:
         st.markdown("### Step 4 — Encode & Download")
 
         if st.button("🔒  Encode Message", type="primary", use_container_width=True):
-            if not message.strip():
+            # Capacity is in bytes: multi-byte UTF-8 characters can overflow
+            # an image even when the character count fits. The encoded bytes
+            # go straight to encode() so it doesn't encode them again.
+            secret     = message.strip().encode("utf-8")
+            secret_len = len(secret)
+            if not secret:
                 st.markdown(
                     '<div class="error-box">✗ Please type a message before encoding.</div>',
                     unsafe_allow_html=True)
-            elif char_count > max_chars:
+            elif secret_len > max_chars:
                 st.markdown(
                     f'<div class="error-box">✗ Message too long '
-                    f'({char_count:,} chars). Max for this image: {max_chars:,}.</div>',
+                    f'({secret_len:,} bytes as UTF-8). Max for this image: {max_chars:,}.</div>',
                     unsafe_allow_html=True)
             else:
                 with st.spinner("Encoding…"):
-                    uploaded.seek(0)
-                    img = Image.open(uploaded)
-                    success, info, png_bytes = encode(img, message.strip(), password)
+                    success, info, png_bytes = _encode_cached(
+                        uploaded.file_id, data, secret, password)
 
                 if success:
                     stem = os.path.splitext(uploaded.name)[0]
                     out_name = stem + "_encoded.png"
 
+                    # encode() got bytes, so count characters from the text here
                     st.markdown(
-                        f'<div class="success-box">✓ {info}</div>',
+                        f'<div class="success-box">✓ Encoded {len(message.strip()):,} '
+                        f'characters into a {w}×{h} image.</div>',
                         unsafe_allow_html=True)
 
                     st.download_button(
@@ -211,22 +232,25 @@ with tab_encode:
                         use_container_width=True,
                     )
 
-                    # Show side-by-side comparison
-                    st.markdown("#### Original vs Encoded")
-                    c1, c2 = st.columns(2)
-                    uploaded.seek(0)
-                    c1.image(Image.open(uploaded), caption="Original", use_container_width=True)
-                    c2.image(Image.open(io.BytesIO(png_bytes)), caption="Encoded (looks identical)", use_container_width=True)
+                    # The original is already previewed in Step 1, so only the
+                    # encoded PNG is shown — passed as raw bytes, no PIL round-trip
+                    st.markdown("#### Encoded Image")
+                    st.image(png_bytes, caption="Encoded (looks identical to the original)", use_container_width=True)
                 else:
                     st.markdown(
                         f'<div class="error-box">✗ {info}</div>',
                         unsafe_allow_html=True)
 
+
+with tab_encode:
+    _encode_tab()
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # DECODE TAB
 # ═══════════════════════════════════════════════════════════════════════════════
 
-with tab_decode:
+@st.fragment
+def _decode_tab():
 
     st.markdown("### Step 1 — Upload the encoded image")
     uploaded_dec = st.file_uploader(
@@ -237,12 +261,14 @@ with tab_decode:
     )
 
     if uploaded_dec:
-        img_dec = Image.open(uploaded_dec)
-        w, h    = img_dec.size
+        data_dec = uploaded_dec.getvalue()
+        img_dec  = _open_rgb(uploaded_dec.file_id, data_dec)
+        w, h     = img_dec.size
 
         col1, col2 = st.columns([1, 1])
         with col1:
-            st.image(img_dec, caption=uploaded_dec.name, use_container_width=True)
+            st.image(_thumbnail(uploaded_dec.file_id, data_dec),
+                     caption=uploaded_dec.name, use_container_width=True)
         with col2:
             st.markdown(f"""
             <div style="padding-top:10px">
@@ -267,9 +293,8 @@ with tab_decode:
 
         if st.button("🔓  Decode Message", type="primary", use_container_width=True):
             with st.spinner("Decoding…"):
-                uploaded_dec.seek(0)
-                img_dec = Image.open(uploaded_dec)
-                success, result = decode(img_dec, password_dec)
+                success, result = _decode_cached(
+                    uploaded_dec.file_id, data_dec, password_dec)
 
             if success:
                 st.markdown(
@@ -294,11 +319,17 @@ with tab_decode:
                     f'<div class="error-box">✗ {result}</div>',
                     unsafe_allow_html=True)
 
+
+with tab_decode:
+    _decode_tab()
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # SOURCE CODE TAB
 # ═══════════════════════════════════════════════════════════════════════════════
 
-with tab_code:
+@st.fragment
+def _source_code_tab():
+    snippets = _load_snippets()
 
     st.markdown("## 💻 Source Code")
     st.markdown(
@@ -313,19 +344,7 @@ with tab_code:
         "We import **Pillow** for image handling and **Tkinter** for the desktop GUI. "
         "The `TERMINATOR` is a sequence of 5 null bytes appended to the end of every "
         "hidden message so the decoder knows where the message ends.")
-    st.code('''import os
-import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
-from PIL import Image
-
-TERMINATOR = b\'\\x00\\x00\\x00\\x00\\x00\'  # 5 null bytes — safe end-of-message marker
-
-SUPPORTED_READ = {
-    ".bmp": "BMP", ".png": "PNG",
-    ".jpg": "JPEG", ".jpeg": "JPEG",
-    ".tiff": "TIFF", ".tif": "TIFF", ".webp": "WebP",
-}
-LOSSY_EXTS = {".jpg", ".jpeg"}''', language="python")
+    st.code(snippets["imports"], language="python")
 
     st.divider()
 
@@ -335,13 +354,7 @@ LOSSY_EXTS = {".jpg", ".jpeg"}''', language="python")
         "XOR encryption works by combining each byte of the message with a byte from "
         "the password key. The same function is used to both **encrypt** and **decrypt** "
         "— XORing twice with the same key restores the original data.")
-    st.code('''def xor_cipher(data: bytes, key: str) -> bytes:
-    """XOR-encrypt or decrypt raw bytes with a string key."""
-    if not key:
-        return data
-    key_bytes = key.encode("utf-8")
-    return bytes(b ^ key_bytes[i % len(key_bytes)] for i, b in enumerate(data))''',
-        language="python")
+    st.code(snippets["xor_cipher"], language="python")
 
     st.divider()
 
@@ -351,9 +364,7 @@ LOSSY_EXTS = {".jpg", ".jpeg"}''', language="python")
         "Each pixel has 3 colour channels (Red, Green, Blue). We hide **1 bit** in the "
         "least significant bit (LSB) of each channel — so 3 bits per pixel. "
         "Every 8 bits = 1 character, giving us `pixels × 3 ÷ 8` characters of capacity.")
-    st.code('''def get_max_chars(pixel_count: int) -> int:
-    usable_bytes = (pixel_count * 3) // 8
-    return usable_bytes - len(TERMINATOR)''', language="python")
+    st.code(snippets["capacity"], language="python")
 
     st.divider()
 
@@ -363,26 +374,7 @@ LOSSY_EXTS = {".jpg", ".jpeg"}''', language="python")
         "The encode function converts the message to binary, then writes each bit into "
         "the **least significant bit** of each pixel channel value. Changing only the "
         "last bit means the colour changes by at most 1 out of 255 — completely invisible to the eye.")
-    st.code('''def encode_image(image_path, secret_message, output_path, password=""):
-    # Load image pixels via Pillow
-    pixels, width, height = load_rgb_pixels(image_path)
-
-    # Optionally encrypt with XOR, then add terminator
-    raw = secret_message.encode("utf-8")
-    if password:
-        raw = xor_cipher(raw, password)
-    payload = raw + TERMINATOR
-
-    # Convert payload to a string of 1s and 0s
-    bits = "".join(format(byte, "08b") for byte in payload)
-
-    # Write each bit into the LSB of each pixel channel
-    for i, bit in enumerate(bits):
-        pixels[i] = (pixels[i] & 0xFE) | int(bit)
-    #              ↑ clears last bit     ↑ sets it to our bit
-
-    # Always save as PNG (lossless) to preserve the hidden bits
-    save_pixels_as_png(pixels, width, height, output_path)''', language="python")
+    st.code(snippets["encode"], language="python")
 
     st.divider()
 
@@ -391,25 +383,7 @@ LOSSY_EXTS = {".jpg", ".jpeg"}''', language="python")
     st.markdown(
         "Decoding is the reverse: read the LSB from each pixel channel, collect 8 bits "
         "at a time to form a byte, and keep going until the 5 null-byte terminator is found.")
-    st.code('''def decode_image(image_path, password=""):
-    pixels, width, height = load_rgb_pixels(image_path)
-
-    decoded = bytearray()
-    bits = []
-
-    for byte_val in pixels:
-        bits.append(byte_val & 1)      # extract the last bit
-        if len(bits) == 8:
-            decoded.append(int("".join(str(b) for b in bits), 2))
-            bits = []
-            # Stop as soon as we find the terminator
-            if decoded[-5:] == b\'\\x00\\x00\\x00\\x00\\x00\':
-                raw = bytes(decoded[:-5])
-                if password:
-                    raw = xor_cipher(raw, password)
-                return True, raw.decode("utf-8")
-
-    return False, "No hidden message found."''', language="python")
+    st.code(snippets["decode"], language="python")
 
     st.divider()
 
@@ -418,118 +392,11 @@ LOSSY_EXTS = {".jpg", ".jpeg"}''', language="python")
     st.markdown("Expand below to see the complete original source code including the Tkinter GUI.")
 
     with st.expander("Click to show full code"):
-        st.code('''"""
-Image Steganography Tool
-Supports: PNG, BMP, TIFF, WebP  (lossless — data is preserved)
-          JPG / JPEG             (lossy — auto-converted to PNG before encoding)
+        st.code(snippets["desktop_app"], language="python")
 
-Requires: Pillow  →  pip install Pillow
-"""
 
-import os
-import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
-from PIL import Image
-
-TERMINATOR = b\'\\x00\\x00\\x00\\x00\\x00\'
-
-SUPPORTED_READ = {
-    ".bmp": "BMP", ".png": "PNG",
-    ".jpg": "JPEG", ".jpeg": "JPEG",
-    ".tiff": "TIFF", ".tif": "TIFF", ".webp": "WebP",
-}
-LOSSLESS_EXTS = {".bmp", ".png", ".tiff", ".tif", ".webp"}
-LOSSY_EXTS    = {".jpg", ".jpeg"}
-
-
-def xor_cipher(data: bytes, key: str) -> bytes:
-    if not key:
-        return data
-    key_bytes = key.encode("utf-8")
-    return bytes(b ^ key_bytes[i % len(key_bytes)] for i, b in enumerate(data))
-
-
-def get_max_chars(pixel_count: int) -> int:
-    return (pixel_count * 3) // 8 - len(TERMINATOR)
-
-
-def detect_format(path: str):
-    ext = os.path.splitext(path)[1].lower()
-    if ext not in SUPPORTED_READ:
-        return None, False, f"Unsupported type: {ext}"
-    try:
-        with Image.open(path) as img:
-            img.verify()
-    except Exception as e:
-        return None, False, str(e)
-    return ext, ext in LOSSY_EXTS, None
-
-
-def load_rgb_pixels(path: str):
-    with Image.open(path) as img:
-        img = img.convert("RGB")
-        return bytearray(img.tobytes()), img.width, img.height
-
-
-def save_pixels_as_png(pixels, width, height, output_path):
-    img = Image.frombytes("RGB", (width, height), bytes(pixels))
-    img.save(output_path, format="PNG")
-
-
-def encode_image(image_path, secret_message, output_path, password=""):
-    ext, is_lossy, err = detect_format(image_path)
-    if err:
-        return False, err
-    pixels, width, height = load_rgb_pixels(image_path)
-    raw = secret_message.encode("utf-8")
-    if password:
-        raw = xor_cipher(raw, password)
-    payload = raw + TERMINATOR
-    bits = "".join(format(byte, "08b") for byte in payload)
-    for i, bit in enumerate(bits):
-        pixels[i] = (pixels[i] & 0xFE) | int(bit)
-    save_pixels_as_png(pixels, width, height, output_path)
-    return True, f"Encoded successfully! Saved to: {output_path}"
-
-
-def decode_image(image_path, password=""):
-    ext, _, err = detect_format(image_path)
-    if err:
-        return False, err
-    if ext in LOSSY_EXTS:
-        return False, "JPEG cannot be decoded."
-    pixels, _, _ = load_rgb_pixels(image_path)
-    decoded, bits = bytearray(), []
-    for byte_val in pixels:
-        bits.append(byte_val & 1)
-        if len(bits) == 8:
-            decoded.append(int("".join(str(b) for b in bits), 2))
-            bits = []
-            if decoded[-5:] == TERMINATOR:
-                raw = bytes(decoded[:-5])
-                if password:
-                    raw = xor_cipher(raw, password)
-                return True, raw.decode("utf-8")
-    return False, "No hidden message found."
-
-
-class SteganographyApp:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("Image Steganography Tool")
-        self.root.geometry("660x660")
-        # ... (full GUI code) ...
-
-
-def main():
-    root = tk.Tk()
-    SteganographyApp(root)
-    root.mainloop()
-
-
-if __name__ == "__main__":
-    main()
-''', language="python")
+with tab_code:
+    _source_code_tab()
 
 # ── Footer ────────────────────────────────────────────────────────────────────
 
@@ -4,99 +4,122 @@ Works entirely with bytes/BytesIO so Streamlit can pass uploaded files directly.
 """
 
 from PIL import Image
+import numpy as np
 import io
 
+from _xor import xor_cipher
+
 # ── Constants ────────────────────────────────────────────────────────────────
 
 TERMINATOR  = b'\x00\x00\x00\x00\x00'
 LOSSY_EXTS  = {".jpg", ".jpeg"}
 SUPPORTED   = {".png", ".bmp", ".jpg", ".jpeg", ".tiff", ".tif", ".webp"}
+DECODE_BLOCK       = 32768   # target pixel bytes per row strip read by decode
+PNG_COMPRESS_LEVEL = 1       # zlib level: LSB noise barely compresses, so favour speed
 
 # ── Helpers ──────────────────────────────────────────────────────────────────
 
-def xor_cipher(data: bytes, key: str) -> bytes:
-    """XOR-encrypt / decrypt bytes with a string key."""
-    if not key:
-        return data
-    kb = key.encode("utf-8")
-    return bytes(b ^ kb[i % len(kb)] for i, b in enumerate(data))
-
-
 def get_max_chars(pixel_count: int) -> int:
     """Max characters hideable: 3 bits per pixel (RGB), minus terminator."""
     return (pixel_count * 3) // 8 - len(TERMINATOR)
 
 
-def image_to_rgb_pixels(img: Image.Image):
-    """Strip alpha, return flat bytearray + (width, height)."""
-    img = img.convert("RGB")
-    return bytearray(img.tobytes()), img.width, img.height
-
-
-def pixels_to_png_bytes(pixels: bytearray, width: int, height: int) -> bytes:
-    """Reconstruct image from flat RGB bytearray → PNG bytes."""
-    out = Image.frombytes("RGB", (width, height), bytes(pixels))
+def image_to_png_bytes(img: Image.Image, compress_level: int = PNG_COMPRESS_LEVEL) -> bytes:
+    """
+    Save a PIL image → PNG bytes. Any compress_level (0–9) is still lossless,
+    so every LSB survives; it only trades file size against save time.
+    """
     buf = io.BytesIO()
-    out.save(buf, format="PNG")
+    img.save(buf, format="PNG", compress_level=compress_level, optimize=False)
     return buf.getvalue()
 
 # ── Encode ───────────────────────────────────────────────────────────────────
 
-def encode(img: Image.Image, message: str, password: str = "") -> tuple[bool, str, bytes]:
+def encode(img: Image.Image, message: str | bytes, password: str = "",
+           compress_level: int = PNG_COMPRESS_LEVEL) -> tuple[bool, str, bytes]:
     """
-    Hide `message` in `img`.
+    Hide `message` in `img`. Pass bytes to skip the UTF-8 encode step.
+    `compress_level` is the zlib level (0–9) for the output PNG.
     Returns (success, info_message, png_bytes).
     """
-    pixels, w, h = image_to_rgb_pixels(img)
+    # Check capacity (in UTF-8 bytes) before loading pixels or encrypting
+    w, h = img.size
     max_chars = get_max_chars(w * h)
 
-    raw = message.encode("utf-8")
+    raw = message if isinstance(message, bytes) else message.encode("utf-8")
+    if len(raw) > max_chars:
+        return False, (
+            f"Message too long. This image can hold up to "
+            f"{max_chars:,} bytes, but your message is "
+            f"{len(raw):,} bytes as UTF-8."
+        ), b""
+
     if password:
         raw = xor_cipher(raw, password)
     payload = raw + TERMINATOR
 
-    if len(payload) > max_chars + len(TERMINATOR):
-        return False, (
-            f"Message too long. This image can hold up to "
-            f"{max_chars:,} characters, but your message has "
-            f"{len(message):,}."
-        ), b""
+    # unpackbits is MSB-first, the same bit order as format(byte, "08b")
+    bits = np.unpackbits(np.frombuffer(payload, dtype=np.uint8))
+    n    = bits.size
 
-    bits = "".join(format(byte, "08b") for byte in payload)
-    for i, bit in enumerate(bits):
-        pixels[i] = (pixels[i] & 0xFE) | int(bit)
+    # One full copy to write into (convert() already returns a new image);
+    # only the rows the payload spans are read out, patched and pasted back
+    out  = img.convert("RGB") if img.mode != "RGB" else img.copy()
+    rows = -(-n // (w * 3))
+    head = np.frombuffer(out.crop((0, 0, w, rows)).tobytes(), dtype=np.uint8).copy()
+    head[:n] &= 0xFE
+    head[:n] |= bits
+    out.paste(Image.frombytes("RGB", (w, rows), head), (0, 0))
 
-    return True, f"Encoded {len(message):,} characters into a {w}×{h} image.", \
-           pixels_to_png_bytes(pixels, w, h)
+    # Bytes callers skipped UTF-8 work on purpose, so don't decode to count
+    size = f"{len(message):,} {'bytes' if isinstance(message, bytes) else 'characters'}"
+
+    return True, f"Encoded {size} into a {w}×{h} image.", \
+           image_to_png_bytes(out, compress_level)
 
 # ── Decode ───────────────────────────────────────────────────────────────────
 
-def decode(img: Image.Image, password: str = "") -> tuple[bool, str]:
+def decode(img: Image.Image, password: str = "", strict: bool = True) -> tuple[bool, str]:
     """
     Extract a hidden message from `img`.
+    With strict=False, invalid UTF-8 becomes U+FFFD instead of an error.
     Returns (success, message_or_error).
     """
-    pixels, _, _ = image_to_rgb_pixels(img)
-
+    if img.mode != "RGB":   # convert() copies the whole image even when RGB
+        img = img.convert("RGB")
+    w, h = img.size
+
+    # Read LSBs a strip of rows at a time (cropped out on demand, never the
+    # whole image's bytes) and stop at the first terminator, so a short
+    # message costs only the rows it spans. Pixels stay flat and interleaved
+    # (R,G,B,R,…) — the order bits were written in — so no per-channel split
+    # is needed. Bits left over past a whole byte carry into the next strip.
+    rows    = max(1, DECODE_BLOCK // (w * 3))
     decoded = bytearray()
-    bits    = []
-
-    for byte_val in pixels:
-        bits.append(byte_val & 1)
-        if len(bits) == 8:
-            decoded.append(int("".join(str(b) for b in bits), 2))
-            bits = []
-            if (len(decoded) >= len(TERMINATOR) and
-                    decoded[-len(TERMINATOR):] == TERMINATOR):
-                raw = bytes(decoded[:-len(TERMINATOR)])
-                if password:
-                    raw = xor_cipher(raw, password)
-                try:
-                    return True, raw.decode("utf-8")
-                except UnicodeDecodeError:
-                    return False, (
-                        "Could not decode the message.\n"
-                        "Possible causes: wrong password, or no message was encoded here."
-                    )
+    carry   = np.empty(0, dtype=np.uint8)
+    end     = -1
+    for top in range(0, h, rows):
+        strip = img.crop((0, top, w, min(top + rows, h))).tobytes()
+        lsb   = np.concatenate((carry, np.frombuffer(strip, dtype=np.uint8) & 1))
+        whole = lsb.size - lsb.size % 8
+        carry = lsb[whole:]
+        seen  = len(decoded)
+        decoded += np.packbits(lsb[:whole]).tobytes()
+        # Re-check the tail of the previous strip for a split terminator
+        end = decoded.find(TERMINATOR, max(0, seen - len(TERMINATOR) + 1))
+        if end != -1:
+            break
+
+    if end != -1:
+        raw = bytes(decoded[:end])
+        if password:
+            raw = xor_cipher(raw, password)
+        try:
+            return True, raw.decode("utf-8", "strict" if strict else "replace")
+        except UnicodeDecodeError:
+            return False, (
+                "Could not decode the message.\n"
+                "Possible causes: wrong password, or no message was encoded here."
+            )
 
     return False, "No hidden message found in this image."
@@ -13,6 +13,11 @@ How it works:
 """
 
 import hashlib
+import zlib
+
+import numpy as np
+
+from _xor import xor_cipher
 
 # ── Invisible character constants ─────────────────────────────────────────────
 
@@ -22,34 +27,41 @@ START  = '\uFEFF'   # payload start marker
 END    = '\u200D'   # payload end marker
 INVISIBLE = {ZERO, ONE, START, END}
 
-# ── Helpers ───────────────────────────────────────────────────────────────────
+# Each byte value → its 8 invisible chars, MSB first (same order as '08b')
+_BYTE_TO_INVIS = [''.join(ONE if (b >> (7 - i)) & 1 else ZERO for i in range(8))
+                  for b in range(256)]
 
-def xor_cipher(data: bytes, key: str) -> bytes:
-    if not key:
-        return data
-    kb = key.encode('utf-8')
-    return bytes(b ^ kb[i % len(kb)] for i, b in enumerate(data))
+_STRIP_INVISIBLE = str.maketrans('', '', ''.join(INVISIBLE))
+_BIT_CHARS       = {ZERO, ONE}
+_INVIS_TO_BIT    = str.maketrans({ZERO: '0', ONE: '1'})
 
+# ── Helpers ───────────────────────────────────────────────────────────────────
 
 def _checksum(data: bytes) -> bytes:
     """2-byte checksum so we can detect wrong passwords."""
-    return hashlib.md5(data).digest()[:2]
+    return zlib.crc32(data).to_bytes(4, 'big')[:2]
+
+
+def _legacy_checksum(data: bytes) -> bytes:
+    """Truncated MD5 used by older versions — still accepted on decode."""
+    return hashlib.md5(data, usedforsecurity=False).digest()[:2]
 
 
 def strip_invisible(text: str) -> str:
     """Return only the visible characters."""
-    return ''.join(ch for ch in text if ch not in INVISIBLE)
+    return text.translate(_STRIP_INVISIBLE)
 
 
 def has_hidden_message(text: str) -> bool:
-    return START in text and END in text
+    start = text.find(START)
+    return start != -1 and text.find(END, start + 1) != -1
 
 
 # ── Encode ────────────────────────────────────────────────────────────────────
 
-def encode_text(cover_text: str, secret: str, password: str = "") -> tuple:
+def encode_text(cover_text: str, secret: str | bytes, password: str = "") -> tuple:
     """
-    Hide `secret` inside `cover_text`.
+    Hide `secret` inside `cover_text`. Pass bytes to skip the UTF-8 encode step.
     Returns (True, steg_text) or (False, error_message).
     """
     if not cover_text.strip():
@@ -57,7 +69,7 @@ def encode_text(cover_text: str, secret: str, password: str = "") -> tuple:
     if not secret.strip():
         return False, "Secret message cannot be empty."
 
-    raw = secret.encode('utf-8')
+    raw = secret if isinstance(secret, bytes) else secret.encode('utf-8')
 
     # Prepend 2-byte checksum of the plaintext so we can verify on decode
     checksum = _checksum(raw)
@@ -68,8 +80,7 @@ def encode_text(cover_text: str, secret: str, password: str = "") -> tuple:
         payload = xor_cipher(payload, password)
 
     # Convert to invisible chars
-    bits      = ''.join(format(byte, '08b') for byte in payload)
-    invisible = START + ''.join(ONE if b == '1' else ZERO for b in bits) + END
+    invisible = START + ''.join(map(_BYTE_TO_INVIS.__getitem__, payload)) + END
 
     # Insert after first character
     result = cover_text[0] + invisible + cover_text[1:]
@@ -78,30 +89,31 @@ def encode_text(cover_text: str, secret: str, password: str = "") -> tuple:
 
 # ── Decode ────────────────────────────────────────────────────────────────────
 
-def decode_text(steg_text: str, password: str = "") -> tuple:
+def decode_text(steg_text: str, password: str = "", strict: bool = True) -> tuple:
     """
     Extract a hidden message.
+    With strict=False, invalid UTF-8 becomes U+FFFD instead of an error.
     Returns (True, message) or (False, error_message).
     """
     start_idx = steg_text.find(START)
-    end_idx   = steg_text.find(END)
+    end_idx   = steg_text.find(END, start_idx + 1) if start_idx != -1 else -1
 
-    if start_idx == -1 or end_idx == -1 or end_idx <= start_idx:
+    if end_idx == -1:
         return False, "No hidden message found in this text."
 
     hidden_chars = steg_text[start_idx + 1 : end_idx]
 
-    bits = ''
-    for ch in hidden_chars:
-        if ch == ONE:
-            bits += '1'
-        elif ch == ZERO:
-            bits += '0'
+    # Ignore anything other than bit chars a platform may have slipped in
+    if not set(hidden_chars) <= _BIT_CHARS:
+        hidden_chars = ''.join(ch for ch in hidden_chars if ch in _BIT_CHARS)
+    bits = hidden_chars.translate(_INVIS_TO_BIT)
 
     if not bits or len(bits) % 8 != 0:
         return False, "Hidden data is corrupted or incomplete."
 
-    payload = bytes(int(bits[i:i+8], 2) for i in range(0, len(bits), 8))
+    # '0'/'1' as ASCII bytes minus 48 are the bit values; packbits then
+    # packs 8 at a time in C (MSB first, matching encode)
+    payload = np.packbits(np.frombuffer(bits.encode('ascii'), dtype=np.uint8) - 48).tobytes()
 
     # Decrypt if password given
     if password:
@@ -114,13 +126,16 @@ def decode_text(steg_text: str, password: str = "") -> tuple:
     stored_checksum = payload[:2]
     raw             = payload[2:]
 
-    if _checksum(raw) != stored_checksum:
+    # Accepting the legacy digest too doubles the wrong-password false-accept
+    # rate (2/65536 instead of 1/65536) in exchange for old messages decoding.
+    # MD5 only runs when CRC32 doesn't match.
+    if stored_checksum != _checksum(raw) and stored_checksum != _legacy_checksum(raw):
         return False, (
             "Wrong password — the message could not be unlocked.\n"
             "Make sure you're using the same password that was used to hide it."
         )
 
     try:
-        return True, raw.decode('utf-8')
+        return True, raw.decode('utf-8', 'strict' if strict else 'replace')
     except UnicodeDecodeError:
         return False, "Could not decode — message may be corrupted."